@@ -0,0 +1,305 @@
+"""
+ * KingTable 2.0.0 ASGI development server
+ * https://github.com/RobertoPrevato/KingTable
+ *
+ * Copyright 2017, Roberto Prevato
+ * https://robertoprevato.github.io
+ *
+ * Licensed under the MIT license:
+ * http://www.opensource.org/licenses/MIT
+ *
+ * This file contains an asyncio entry point serving the same /api/* routes of server.py, and static files.
+ * Static files and I/O are handled on the event loop; collections search and sort are dispatched to a bounded
+ * compute pool, so a large query doesn't stall other requests. Run it with any ASGI server, for example:
+ *
+ *   uvicorn asgi:app --port 44555
+"""
+import os
+import json
+import asyncio
+import logging
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from urllib.parse import parse_qsl
+from bll.collectionmanager import CollectionManager
+
+# serve the same static files of server.py
+root_dir = os.path.dirname(os.getcwd())
+rel = os.path.join(root_dir, "..", "httpdocs")
+pat = os.path.abspath(rel)
+PORT = 44555
+
+logger = logging.getLogger(__name__)
+
+ColorsManager = CollectionManager("colors.json")
+PeopleManager = CollectionManager("people.json")
+
+# managers of the collections exposed by the api
+managers = {
+    "colors": ColorsManager,
+    "people": PeopleManager
+}
+
+# exact totals of lazy requests are computed through the compute pool, see Application.compute_total
+for manager in managers.values():
+    manager.background_totals = False
+
+
+def get_catalog(name, data):
+    """Gets a catalog page; this function runs inside the compute pool."""
+    return managers[name].get_catalog(data)
+
+
+def get_count(name, data):
+    """Gets the exact count of items that respond to the given filters; this function runs inside the compute pool."""
+    return managers[name].get_count(data)
+
+
+def get_batch(queries):
+    """Gets several catalog pages; this function runs inside the compute pool."""
+    return CollectionManager.get_batch(managers, queries)
+
+
+class PoolBusy(Exception):
+    pass
+
+
+class ComputePool:
+    """
+    Bounded pool of workers used to run CPU-heavy work outside of the event loop.
+    Rejects new work when too many tasks are already running or waiting (backpressure) and stops waiting
+    for tasks that take longer than the configured timeout.
+    """
+    def __init__(self, workers=4, max_queue=16, timeout=10.0, processes=False):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.processes = processes
+        self.pending = 0
+        self._executor = None
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            executor_type = ProcessPoolExecutor if self.processes else ThreadPoolExecutor
+            self._executor = executor_type(max_workers=self.workers)
+        return self._executor
+
+    def _release(self, future):
+        self.pending -= 1
+
+    async def run(self, fn, *args):
+        """
+        Runs the given function in the pool and returns its result.
+
+        :raises PoolBusy: if the queue of pending tasks is full
+        :raises asyncio.TimeoutError: if the task doesn't complete within the configured timeout
+        """
+        if self.pending >= self.workers + self.max_queue:
+            raise PoolBusy
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, fn, *args)
+        self.pending += 1
+        # NB: the slot is released when the task really completes, not when the request times out,
+        # because running tasks cannot be interrupted and still occupy a worker
+        future.add_done_callback(self._release)
+        return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+class Application:
+    """ASGI application serving the KingTable development api and static files."""
+    def __init__(self, pool, static_folder=pat):
+        self.pool = pool
+        self.static_folder = static_folder
+        self._pending_totals = set()
+        # references to background tasks, since the event loop keeps only weak references to them
+        self._tasks = set()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        path = scope["path"]
+        method = scope["method"]
+        if path.startswith("/api/"):
+            body = await self.read_body(receive)
+            status, headers, content = await self.handle_api(path[5:], method, scope, body)
+        elif method in ("GET", "HEAD"):
+            status, headers, content = await self.handle_static(path)
+        else:
+            status, headers, content = self.text_response(405, "Method Not Allowed")
+
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": b"" if method == "HEAD" else content})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.pool.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def read_body(receive):
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                return body
+
+    async def handle_api(self, name, method, scope, body):
+        if name != "batch" and name != "count" and name not in managers:
+            return self.text_response(404, "Not Found")
+        allowed = ("OPTIONS", "POST") if name == "batch" else ("OPTIONS", "GET", "POST")
+        allow_header = (b"allow", ", ".join(allowed).encode("latin-1"))
+        if method not in allowed:
+            status, headers, content = self.text_response(405, "Method Not Allowed")
+            return status, headers + [allow_header], content
+        if method == "OPTIONS":
+            return 200, [allow_header], b""
+        try:
+            data = self.get_filters_data(scope, body)
+        except ValueError:
+            return self.text_response(400, "Invalid JSON data.")
+        if not isinstance(data, dict):
+            return self.text_response(400, "Invalid filters data.")
+
+        if name == "batch":
+            queries = data.get("queries")
+            if not isinstance(queries, list):
+                return self.text_response(400, "Missing queries data.")
+            fn, args = get_batch, (queries,)
+        elif name == "count":
+            collection = data.get("collection")
+            if collection not in managers:
+                return self.text_response(400, "Invalid collection: {}.".format(collection))
+            fn, args = get_count, (collection, data)
+        else:
+            if not data:
+                return self.text_response(400, "Missing filters data.")
+            fn, args = get_catalog, (name, data)
+
+        try:
+            result = await self.pool.run(fn, *args)
+        except PoolBusy:
+            return self.text_response(503, "Server busy, retry later.")
+        except asyncio.TimeoutError:
+            return self.text_response(504, "Request timed out.")
+        except (TypeError, KeyError, ValueError) as ex:
+            # invalid or missing filters, like a missing page number
+            return self.text_response(400, "Invalid filters data: {}".format(ex))
+
+        if name == "batch":
+            result = {"results": result}
+        elif result.get("totalExact") is False:
+            self.compute_total(name, data)
+        return self.json_response(result)
+
+    def compute_total(self, name, data):
+        """
+        Computes in background the exact selection of a lazy request, so it is cached for following requests.
+        This work is run only when the compute pool has idle workers, so it never delays other requests.
+        """
+        key = (name, CollectionManager.get_selection_key(data.get("search"), data.get("sortBy"), data.get("lang")))
+        if key in self._pending_totals or self.pool.pending >= self.pool.workers:
+            return
+        self._pending_totals.add(key)
+
+        async def run():
+            try:
+                await self.pool.run(get_count, name, data)
+            except (PoolBusy, asyncio.TimeoutError):
+                pass
+            except Exception:
+                logger.exception("Failed to compute the exact total for %s", name)
+            finally:
+                self._pending_totals.discard(key)
+
+        task = asyncio.ensure_future(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    def get_filters_data(scope, body):
+        if body:
+            return json.loads(body.decode("utf-8"))
+        # maybe the client is sending data through query string?
+        return dict(parse_qsl(scope.get("query_string", b"").decode("latin-1")))
+
+    async def handle_static(self, path):
+        root = os.path.abspath(self.static_folder)
+        file_path = os.path.abspath(os.path.join(root, path.lstrip("/")))
+        if not file_path.startswith(root + os.sep) or not os.path.isfile(file_path):
+            return self.text_response(404, "Not Found")
+
+        # read the file in the default executor of the loop, which is separate from the compute pool,
+        # so static files are never queued behind heavy queries
+        loop = asyncio.get_running_loop()
+        content = await loop.run_in_executor(None, self.read_file, file_path)
+        content_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+        return 200, [(b"content-type", content_type.encode("latin-1"))], content
+
+    @staticmethod
+    def read_file(path):
+        with open(path, mode="rb") as f:
+            return f.read()
+
+    @staticmethod
+    def json_response(data):
+        content = json.dumps(data, indent=4).encode("utf-8")
+        max_age = 60*15
+        return 200, [(b"content-type", b"application/json"),
+                     (b"cache-control", ("max-age=%s" % max_age).encode("latin-1"))], content
+
+    @staticmethod
+    def text_response(status, text):
+        return status, [(b"content-type", b"text/plain")], text.encode("utf-8")
+
+
+def get_pool_options(environ):
+    """
+    Reads the compute pool options from the given environment variables:
+    KT_POOL_WORKERS, KT_POOL_QUEUE, KT_POOL_TIMEOUT (seconds) and KT_POOL_PROCESSES (true to use processes).
+    """
+    return {
+        "workers": int(environ.get("KT_POOL_WORKERS", 4)),
+        "max_queue": int(environ.get("KT_POOL_QUEUE", 16)),
+        "timeout": float(environ.get("KT_POOL_TIMEOUT", 10.0)),
+        "processes": environ.get("KT_POOL_PROCESSES", "").lower() in ("true", "1")
+    }
+
+
+app = Application(ComputePool(**get_pool_options(os.environ)))
+
+
+if __name__ == "__main__":
+    import argparse
+    options = get_pool_options(os.environ)
+    parser = argparse.ArgumentParser(description="KingTable ASGI development server")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=options["workers"], help="number of compute workers")
+    parser.add_argument("--queue", type=int, default=options["max_queue"],
+                        help="maximum number of requests waiting for a compute worker")
+    parser.add_argument("--timeout", type=float, default=options["timeout"], help="request timeout, in seconds")
+    parser.add_argument("--processes", action="store_true", default=options["processes"],
+                        help="use a pool of processes instead of threads")
+    args = parser.parse_args()
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("uvicorn is required to run the ASGI server: pip install uvicorn")
+    app.pool = ComputePool(args.workers, args.queue, args.timeout, args.processes)
+    print("...serving static files from: {}".format(pat))
+    uvicorn.run(app, port=args.port)
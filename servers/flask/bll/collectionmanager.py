@@ -12,15 +12,44 @@
 """
 import os
 import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from core.lists.listutils import ListUtils
 from core.literature.scribe import Scribe
+from core.regional.culture import Culture, DisplayValues
 
 
 class CollectionManager:
     """Provides methods to work with underlying collections; read from static json structures"""
+
+    # maximum number of filtered and sorted selections kept in memory, for each collection
+    selections_cache_size = 20
+
+    # maximum number of adjacent pages that a client can request to prefetch, on each side
+    max_prefetch = 3
+
+    # maximum number of languages for which display values are kept in memory, for each collection
+    display_values_cache_size = 4
+
+    # number of threads computing exact selections in background, for lazy totals
+    background_workers = 1
+
+    # maximum number of selections waiting to be computed in background; older ones are dropped, since with
+    # live search they are usually stale (e.g. "b", "bl", "blu" while the user is typing "blue")
+    max_pending_selections = 1
+
     def __init__(self, file_path):
         self.file_path = file_path
         self._collection = None
+        self._selections = OrderedDict()
+        self._display_values = OrderedDict()
+        self._pending = OrderedDict()
+        self._background = None
+        self._lock = threading.Lock()
+        # when False, exact selections for lazy totals are not computed in background by this manager,
+        # and the caller is responsible for requesting them (e.g. the ASGI server uses its compute pool)
+        self.background_totals = True
 
     def get_catalog(self, data):
         if data is None:
@@ -31,20 +60,187 @@ class CollectionManager:
         page_size = int(data.get("size"))
         search = data.get("search")
         sort_by = data.get("sortBy")
+        # language of the client, used to search dates and numbers by their culture-dependent representations
+        lang = Culture.normalize_lang(data.get("lang"))
+        lazy_total = str(data.get("lazyTotal")).lower() in ("true", "1")
+        total_exact = True
         # get the collection
-        collection, total_rows = self.get_catalog_page(page_number, page_size, search, sort_by)
+        if lazy_total:
+            collection, total_rows, total_exact = self.get_catalog_page_lazy(page_number, page_size, search, sort_by, lang)
+        else:
+            collection, total_rows = self.get_catalog_page(page_number, page_size, search, sort_by, lang)
         # optimize the collection
         collection = ListUtils.optimize_list(collection)
         result = {"subset": collection, "page": page_number, "total": total_rows}
+        if lazy_total:
+            # when the total is not exact, it is the minimum count of items that respond to the search
+            result["totalExact"] = total_exact
+
+        prefetch = self.get_prefetch_count(data.get("prefetch"))
+        if prefetch > 0 and total_exact:
+            # include the adjacent pages in the response, so the client can navigate to
+            # the next and previous pages without waiting for another round trip;
+            # the selection is cached, so this doesn't repeat the search and sort
+            result["adjacent"] = self.get_adjacent_pages(page_number, page_size, search, sort_by, total_rows, prefetch,
+                                                        lang)
         return result
 
+    def get_count(self, data):
+        """Gets the exact count of items that respond to the given filters."""
+        if data is None:
+            raise TypeError
+        lang = Culture.normalize_lang(data.get("lang"))
+        collection = self.get_selection(data.get("search"), data.get("sortBy"), lang)
+        return {"total": len(collection)}
+
+    def get_catalogs(self, queries):
+        """
+        Gets several catalog pages in a single call.
+        Queries sharing the same search and sort criteria reuse the same filtered and sorted selection.
+
+        :param queries: list of filters data, like those handled by get_catalog
+        :return: list of results, in the same order of the given queries
+        """
+        if queries is None:
+            raise TypeError
+        return [self.get_catalog(data) for data in queries]
+
+    @staticmethod
+    def get_batch(managers, queries):
+        """
+        Gets catalog pages of several collections in a single call.
+
+        :param managers: dictionary of collection managers, by collection name
+        :param queries: list of filters data, each one including the name of the collection
+        :return: list of results, in the same order of the given queries
+        """
+        if not isinstance(queries, list):
+            raise TypeError
+        # group queries by collection, so each manager handles its own queries together
+        results = [None] * len(queries)
+        groups = OrderedDict()
+        for i, query in enumerate(queries):
+            name = query.get("collection") if isinstance(query, dict) else None
+            if name not in managers:
+                raise ValueError("Invalid collection: {}.".format(name))
+            groups.setdefault(name, []).append(i)
+
+        for name, indexes in groups.items():
+            subsets = managers[name].get_catalogs([queries[i] for i in indexes])
+            for i, result in zip(indexes, subsets):
+                results[i] = result
+        return results
+
+    @classmethod
+    def get_prefetch_count(cls, value):
+        """Returns the number of adjacent pages to prefetch on each side; ignoring invalid values."""
+        try:
+            count = int(value or 0)
+        except (TypeError, ValueError):
+            return 0
+        return max(0, min(count, cls.max_prefetch))
+
+    def get_adjacent_pages(self, page_number, page_size, search, sort_by, total_rows, count, lang=None):
+        """Gets up to the given count of pages before and after the given page number, by page number."""
+        pages = {}
+        # NB: get_catalog_page treats pages lower than 1 as the first page
+        page_number = max(page_number, 1)
+        page_count = (total_rows + page_size - 1) // page_size if page_size > 0 else 0
+        for i in range(1, count + 1):
+            for n in (page_number - i, page_number + i):
+                if 1 <= n <= page_count:
+                    collection, _ = self.get_catalog_page(n, page_size, search, sort_by, lang)
+                    pages[str(n)] = ListUtils.optimize_list(collection)
+        return pages
+
     def get_data_path(self):
         root_dir = os.path.dirname(os.getcwd())
         rel = os.path.join(root_dir, "flask", "data", self.file_path)
         return os.path.abspath(rel)
 
-    def get_catalog_page(self, page_number, page_size, search, sort_by):
+    def get_catalog_page(self, page_number, page_size, search, sort_by, lang=None):
         """Gets a catalog page of the managed collection."""
+        collection = self.get_selection(search, sort_by, lang)
+
+        # return a paginated result to the client:
+        skip = ((page_number-1)*page_size) if page_number > 0 else 0
+
+        # the client needs to know the total items count, in order to build the pagination
+        total_items_count = len(collection)
+
+        result = ListUtils.sampling(collection, skip, page_size)
+        # return the collection and the count of results:
+        return result, total_items_count
+
+    def get_catalog_page_lazy(self, page_number, page_size, search, sort_by, lang=None):
+        """
+        Gets a catalog page of the managed collection, without necessarily searching the whole collection.
+        When the selection is not cached and doesn't need sorting, the search stops as soon as the requested page
+        is complete; in this case the returned total is a minimum count and the exact selection is computed
+        in background, for the following requests.
+
+        :return: page items, total items count, whether the total is exact
+        """
+        key = self.get_selection_key(search, sort_by, lang)
+        with self._lock:
+            cached = key in self._selections
+        if cached or sort_by or not search:
+            # NB: sorting requires all the items that respond to the search
+            result, total_items_count = self.get_catalog_page(page_number, page_size, search, sort_by, lang)
+            return result, total_items_count, True
+
+        skip = ((page_number-1)*page_size) if page_number > 0 else 0
+        # look for one more item, to know whether there is a following page
+        limit = skip + page_size + 1
+        collection = ListUtils.search(self.get_all(), search, "*", limit, self.get_display_values(lang))
+        result = ListUtils.sampling(collection, skip, page_size)
+        if len(collection) < limit:
+            # the whole collection was searched: the selection is complete
+            self.set_selection(key, collection)
+            return result, len(collection), True
+
+        if self.background_totals:
+            self.compute_selection_async(search, sort_by, lang)
+        return result, len(collection), False
+
+    def compute_selection_async(self, search, sort_by, lang=None):
+        """
+        Computes and caches a selection in background, unless it is already cached or being computed.
+        Work runs on a bounded executor; selections still waiting to be computed are dropped when newer ones
+        are requested.
+        """
+        key = self.get_selection_key(search, sort_by, lang)
+        with self._lock:
+            if key in self._pending or key in self._selections:
+                return
+            waiting = [k for k, future in self._pending.items() if not future.running()]
+            while waiting and len(waiting) >= self.max_pending_selections:
+                k = waiting.pop(0)
+                if self._pending[k].cancel():
+                    del self._pending[k]
+            if self._background is None:
+                self._background = ThreadPoolExecutor(max_workers=self.background_workers)
+            self._pending[key] = self._background.submit(self._compute_selection, key, search, sort_by, lang)
+
+    def _compute_selection(self, key, search, sort_by, lang):
+        try:
+            self.get_selection(search, sort_by, lang)
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def get_selection(self, search, sort_by, lang=None):
+        """
+        Gets the managed collection filtered by the given search and sorted by the given criteria.
+        Selections are cached, so that requests for different pages of the same selection share
+        the cost of search and sort.
+        """
+        key = self.get_selection_key(search, sort_by, lang)
+        with self._lock:
+            if key in self._selections:
+                self._selections.move_to_end(key)
+                return self._selections[key]
+
         collection = self.get_all()
         if search is not None and search != "":
             """
@@ -56,23 +252,53 @@ class CollectionManager:
             # As a side note, keep in mind that some properties, like dates and decimal, should be evaluated for their
             # culture-dependent string representations of values; not their intrinsic values.
             # Example: a date in UK English can be dd/mm/yyyy; in US English can be mm/dd/yyyy.
-            # A well designed search implementation adapts to the current user's culture.
+            # A well designed search implementation adapts to the current user's culture: here, display values
+            # are computed once for each language and cached.
             """
-            collection = ListUtils.search(collection, search, "*")
+            collection = ListUtils.search(collection, search, "*", None, self.get_display_values(lang))
 
         # NB: if an order by is defined; we need to order before paginating results!
         if sort_by:
-            collection = ListUtils.sort_by(collection, sort_by)
+            # sort a copy, since the full collection and other selections are shared
+            criteria = sort_by if isinstance(sort_by, str) else [list(x) for x in sort_by]
+            collection = ListUtils.sort_by(list(collection), criteria)
 
-        # return a paginated result to the client:
-        skip = ((page_number-1)*page_size) if page_number > 0 else 0
+        self.set_selection(key, collection)
+        return collection
 
-        # the client needs to know the total items count, in order to build the pagination
-        total_items_count = len(collection)
+    def set_selection(self, key, collection):
+        with self._lock:
+            self._selections[key] = collection
+            self._selections.move_to_end(key)
+            while len(self._selections) > self.selections_cache_size:
+                self._selections.popitem(last=False)
 
-        result = ListUtils.sampling(collection, skip, page_size)
-        # return the collection and the count of results:
-        return result, total_items_count
+    @staticmethod
+    def get_selection_key(search, sort_by, lang=None):
+        # the language affects only the results of searches
+        return json.dumps([search or "", sort_by or "", Culture.normalize_lang(lang) if search else ""])
+
+    def get_display_values(self, lang):
+        """
+        Gets the culture-dependent string representations of dates and numbers of the managed collection,
+        for the given language; in the same order of the collection. Values are computed lazily, item by item.
+        """
+        lang = Culture.normalize_lang(lang)
+        with self._lock:
+            if lang in self._display_values:
+                self._display_values.move_to_end(lang)
+                return self._display_values[lang]
+
+        display_values = DisplayValues(self.get_all(), lang)
+
+        with self._lock:
+            if lang in self._display_values:
+                # another thread created them in the meanwhile
+                return self._display_values[lang]
+            self._display_values[lang] = display_values
+            while len(self._display_values) > self.display_values_cache_size:
+                self._display_values.popitem(last=False)
+        return display_values
 
     def get_all(self):
         """Gets the complete list of colors."""
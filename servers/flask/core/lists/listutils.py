@@ -73,22 +73,33 @@ class ListUtils:
 
 
     @staticmethod
-    def search(collection, search, properties):
-        """Simple search method, that supports only exact text."""
+    def search(collection, search, properties, limit=None, display_values=None):
+        """
+        Simple search method, that supports only exact text.
+
+        :param limit: if specified, stops searching as soon as this number of matching items is found
+        :param display_values: if specified, culture-dependent string representations of the non-string
+                               values of each item, by property name, in the same order of the collection;
+                               only those of the searched properties are matched
+        """
         # escape characters that need to be escaped
         search = re.escape(search)
         rx = re.compile(search, re.IGNORECASE)
         result = []
-        for item in collection:
-            if properties == "*":
-                for x in item:
-                    # TODO: support better non-strings with their culture-dependent representations
-                    if rx.search(item[x]):
-                        result.append(item)
-                        break
-            else:
-                for p in properties:
-                    if rx.search(item[p]):
-                        result.append(item)
-                        break
+        for i, item in enumerate(collection):
+            if limit is not None and len(result) >= limit:
+                break
+            keys = item if properties == "*" else properties
+            if any(isinstance(item[x], str) and rx.search(item[x]) for x in keys) \
+                    or (display_values is not None and ListUtils.search_values(rx, display_values[i], keys)):
+                result.append(item)
         return result
+
+    @staticmethod
+    def search_values(rx, values, keys):
+        """Returns a value indicating whether any of the string values of the given properties matches."""
+        for x in keys:
+            for v in values.get(x, ()):
+                if rx.search(v):
+                    return True
+        return False
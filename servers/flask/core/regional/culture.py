@@ -0,0 +1,122 @@
+import re
+from datetime import datetime
+
+# matches ISO 8601 dates and datetimes, like 1988-01-12 or 2014-03-18T02:55:21
+iso_date_rx = re.compile(r"^\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2})?)?")
+
+# default formats of the KingTable client: DateUtils.defaults.format ("DD.MM.YYYY" and "DD.MM.YYYY HH:mm:ss")
+# and NumberUtils.format (Intl.NumberFormat with "en-GB" locale); these are displayed whatever the table language
+DEFAULT_FORMATS = {"date": "%d.%m.%Y", "datetime": "%d.%m.%Y %H:%M:%S", "thousands": ",", "decimal": "."}
+
+# culture-dependent variants, by language code, for clients that override the default formats
+FORMATS = {
+    "en": DEFAULT_FORMATS,
+    "en-us": {"date": "%m/%d/%Y", "datetime": "%m/%d/%Y %H:%M:%S", "thousands": ",", "decimal": "."},
+    "en-gb": {"date": "%d/%m/%Y", "datetime": "%d/%m/%Y %H:%M:%S", "thousands": ",", "decimal": "."},
+    "it": {"date": "%d/%m/%Y", "datetime": "%d/%m/%Y %H:%M:%S", "thousands": ".", "decimal": ","},
+    "de": {"date": "%d.%m.%Y", "datetime": "%d.%m.%Y %H:%M:%S", "thousands": ".", "decimal": ","},
+    "fr": {"date": "%d/%m/%Y", "datetime": "%d/%m/%Y %H:%M:%S", "thousands": " ", "decimal": ","},
+    "es": {"date": "%d/%m/%Y", "datetime": "%d/%m/%Y %H:%M:%S", "thousands": ".", "decimal": ","}
+}
+
+DEFAULT_LANG = "en"
+
+# maximum fraction digits displayed by Intl.NumberFormat, by default
+MAX_FRACTION_DIGITS = 3
+
+
+class Culture:
+
+    @staticmethod
+    def normalize_lang(lang):
+        """
+        Returns the supported language code that best matches the given one (e.g. it-IT -> it);
+        or the default language.
+        """
+        if not lang or not isinstance(lang, str):
+            return DEFAULT_LANG
+        lang = lang.strip().lower().replace("_", "-")
+        if lang in FORMATS:
+            return lang
+        lang = lang.split("-")[0]
+        return lang if lang in FORMATS else DEFAULT_LANG
+
+    @staticmethod
+    def format_number(value, lang=None):
+        """
+        Formats a number with the thousands and decimal separators of the given language, like Intl.NumberFormat;
+        or with the default format of the KingTable client, if a language is not given.
+        """
+        fmt = FORMATS[Culture.normalize_lang(lang)] if lang else DEFAULT_FORMATS
+        if isinstance(value, int):
+            s = "{:,}".format(value)
+        else:
+            s = "{:,.{}f}".format(value, MAX_FRACTION_DIGITS).rstrip("0").rstrip(".")
+        return s.replace(",", "\0").replace(".", fmt["decimal"]).replace("\0", fmt["thousands"])
+
+    @staticmethod
+    def parse_date(value):
+        """Parses an ISO 8601 date or datetime string; returns None if the string doesn't represent a date."""
+        m = iso_date_rx.match(value)
+        if m is None:
+            return None
+        s = m.group(0).replace(" ", "T")
+        for pattern in ("%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M", "%Y-%m-%d"):
+            try:
+                return datetime.strptime(s, pattern), "T" in s
+            except ValueError:
+                pass
+        return None
+
+    @staticmethod
+    def format_date(value, has_time, lang=None):
+        """
+        Formats a datetime with the date (and optionally time) format of the given language;
+        or with the default format of the KingTable client, if a language is not given.
+        """
+        fmt = FORMATS[Culture.normalize_lang(lang)] if lang else DEFAULT_FORMATS
+        return value.strftime(fmt["datetime" if has_time else "date"])
+
+    @staticmethod
+    def get_display_values(item, lang):
+        """
+        Returns the culture-dependent string representations of the dates and numbers of the given item,
+        by property name, which are used for searching: first those displayed by default by the KingTable client,
+        then those of the given language.
+        """
+        result = {}
+        for name, x in item.items():
+            if isinstance(x, bool) or x is None:
+                continue
+            if isinstance(x, (int, float)):
+                values = [Culture.format_number(x), Culture.format_number(x, lang), str(x)]
+            elif isinstance(x, str):
+                parsed = Culture.parse_date(x)
+                if parsed is None:
+                    continue
+                values = [Culture.format_date(parsed[0], parsed[1]), Culture.format_date(parsed[0], parsed[1], lang)]
+            else:
+                continue
+            result[name] = [value for i, value in enumerate(values) if value not in values[:i]]
+        return result
+
+
+class DisplayValues:
+    """
+    Display values of the items of a collection, for a language, in the same order of the collection.
+    Display values of each item are computed the first time they are requested, so searches that stop early
+    don't pay for formatting the whole collection.
+    """
+    def __init__(self, collection, lang):
+        self.collection = collection
+        self.lang = lang
+        self._values = [None] * len(collection)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __getitem__(self, index):
+        values = self._values[index]
+        if values is None:
+            values = self._values[index] = Culture.get_display_values(self.collection[index], self.lang)
+        return values
@@ -6,6 +6,8 @@ import unittest
 from tests.server_test import ServerTestCase
 from tests.helpers_test import HelpersTestCase
 from tests.array_test import ArrayUtilsTestCase
+from tests.asgi_test import AsgiTestCase
+from tests.culture_test import CultureTestCase
 
 if __name__ == "__main__":
     unittest.main()
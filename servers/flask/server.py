@@ -28,6 +28,12 @@ ColorsManager = CollectionManager("colors.json")
 PeopleManager = CollectionManager("people.json")
 ProductsManager = CollectionManager("products.json")
 
+# managers of the collections that can be requested through the batch api
+managers = {
+    "colors": ColorsManager,
+    "people": PeopleManager
+}
+
 #   {{ resources("sharedjs")|safe }}
 plain_text = {"Content-Type": "text/plain"}
 json_type = {"Content-Type": "application/json"}
@@ -161,6 +167,46 @@ def people():
     result = PeopleManager.get_catalog(data)
     return get_json_response(result)
 
+@app.route("/api/batch", methods=["POST"])
+def batch():
+    """
+    Returns several catalog pages in a single round trip.
+    Expects a body like: {"queries": [{"collection": "colors", "page": 1, "size": 30, ...}, ...]}
+    """
+    data = request.get_json()
+    queries = data.get("queries") if isinstance(data, dict) else None
+    if not isinstance(queries, list):
+        return "Missing queries data.", 400, {"Content-Type": "text/plain"}
+
+    try:
+        results = CollectionManager.get_batch(managers, queries)
+    except (TypeError, KeyError, ValueError) as ex:
+        # invalid or missing filters, like a missing page number
+        return "Invalid filters data: {}".format(ex), 400, {"Content-Type": "text/plain"}
+
+    return get_json_response({"results": results})
+
+@app.route("/api/count", methods=["OPTIONS", "GET", "POST"])
+def count():
+    """
+    Returns the exact count of items that respond to the given filters, for a collection.
+    This can be used as a follow-up request, when a catalog page is requested with lazy total.
+    """
+    try:
+        data = get_filters_data(request)
+    except MissingFilters:
+        return "Missing filters data.", 400, {"Content-Type": "text/plain"}
+
+    name = data.get("collection")
+    if name not in managers:
+        return "Invalid collection: {}.".format(name), 400, {"Content-Type": "text/plain"}
+
+    try:
+        result = managers[name].get_count(data)
+    except (TypeError, KeyError, ValueError) as ex:
+        return "Invalid filters data: {}".format(ex), 400, {"Content-Type": "text/plain"}
+    return get_json_response(result)
+
 @app.route("/<path:path>")
 def static_proxy(path):
     return app.send_static_file(path)
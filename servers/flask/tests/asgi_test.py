@@ -0,0 +1,138 @@
+import time
+import json
+import asyncio
+import unittest
+from asgi import Application, ComputePool, PoolBusy, get_pool_options
+
+
+def call(app, method, path, body=b"", query_string=b""):
+    """Calls the given ASGI application and returns the response status, headers and body."""
+    return asyncio.run(request(app, method, path, body, query_string))
+
+
+async def request(app, method, path, body=b"", query_string=b""):
+    """Calls the given ASGI application inside the running event loop."""
+    scope = {"type": "http", "method": method, "path": path, "query_string": query_string}
+    messages = [{"type": "http.request", "body": body}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await app(scope, receive, send)
+    return sent[0]["status"], dict(sent[0]["headers"]), sent[1]["body"]
+
+
+class AsgiTestCase(unittest.TestCase):
+    """
+      ASGI entry point tests.
+    """
+    def setUp(self):
+        self.app = Application(ComputePool(workers=2, max_queue=0, timeout=5.0))
+
+    def tearDown(self):
+        self.app.pool.shutdown()
+
+    def test_api(self):
+        status, headers, body = call(self.app, "GET", "/api/colors", query_string=b"page=1&size=30")
+        assert status == 200
+        assert headers[b"content-type"] == b"application/json"
+        data = json.loads(body.decode("utf-8"))
+        assert data["total"] == 1247
+        assert len(data["subset"]) == 31
+
+    def test_api_post(self):
+        filters = json.dumps({"page": 1, "size": 10, "search": "green"}).encode("utf-8")
+        status, headers, body = call(self.app, "POST", "/api/colors", body=filters)
+        assert status == 200
+        data = json.loads(body.decode("utf-8"))
+        assert 0 < data["total"] < 1247
+
+    def test_batch_api(self):
+        queries = json.dumps({"queries": [
+            {"collection": "colors", "page": 1, "size": 10},
+            {"collection": "people", "page": 1, "size": 10}
+        ]}).encode("utf-8")
+        status, headers, body = call(self.app, "POST", "/api/batch", body=queries)
+        assert status == 200
+        data = json.loads(body.decode("utf-8"))
+        assert len(data["results"]) == 2
+
+    def test_missing_filters(self):
+        status, headers, body = call(self.app, "GET", "/api/colors")
+        assert status == 400
+
+    def test_static_file_not_found(self):
+        status, headers, body = call(self.app, "GET", "/../server.py")
+        assert status == 404
+
+    def test_pool_backpressure(self):
+        pool = ComputePool(workers=1, max_queue=0, timeout=5.0)
+
+        async def run():
+            first = asyncio.ensure_future(pool.run(time.sleep, 0.2))
+            await asyncio.sleep(0)
+            with self.assertRaises(PoolBusy):
+                await pool.run(time.sleep, 0)
+            await first
+
+        asyncio.run(run())
+        pool.shutdown()
+
+    def test_pool_timeout(self):
+        pool = ComputePool(workers=1, max_queue=0, timeout=0.05)
+
+        async def run():
+            await pool.run(time.sleep, 0.2)
+
+        with self.assertRaises(asyncio.TimeoutError):
+            asyncio.run(run())
+        pool.shutdown()
+
+    def test_invalid_filters(self):
+        for path in ("/api/colors", "/api/count", "/api/batch"):
+            for body in (b"[1]", b'"x"'):
+                status, headers, content = call(self.app, "POST", path, body=body)
+                assert status == 400
+
+        status, headers, body = call(self.app, "GET", "/api/colors", query_string=b"size=3")
+        assert status == 400
+
+    def test_methods(self):
+        status, headers, body = call(self.app, "OPTIONS", "/api/colors")
+        assert status == 200
+        status, headers, body = call(self.app, "OPTIONS", "/api/nope")
+        assert status == 404
+        status, headers, body = call(self.app, "GET", "/api/batch")
+        assert status == 405
+
+    def test_pool_options(self):
+        options = get_pool_options({"KT_POOL_WORKERS": "2", "KT_POOL_PROCESSES": "true"})
+        self.assertEqual(2, options["workers"])
+        self.assertEqual(16, options["max_queue"])
+        self.assertTrue(options["processes"])
+
+    def test_lazy_total(self):
+        filters = json.dumps({"page": 1, "size": 5, "search": "yellow", "lazyTotal": True}).encode("utf-8")
+        count_filters = json.dumps({"collection": "colors", "search": "yellow"}).encode("utf-8")
+
+        async def run():
+            status, headers, body = await request(self.app, "POST", "/api/colors", body=filters)
+            first = json.loads(body.decode("utf-8"))
+            # wait for the exact total to be computed in background, through the compute pool
+            for i in range(200):
+                await asyncio.sleep(0.01)
+                status, headers, body = await request(self.app, "POST", "/api/colors", body=filters)
+                second = json.loads(body.decode("utf-8"))
+                if second["totalExact"]:
+                    break
+            status, headers, body = await request(self.app, "POST", "/api/count", body=count_filters)
+            return first, second, json.loads(body.decode("utf-8"))["total"]
+
+        first, second, total = asyncio.run(run())
+        assert first["totalExact"] is False
+        assert second["totalExact"] is True
+        assert second["total"] == total
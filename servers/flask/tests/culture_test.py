@@ -0,0 +1,73 @@
+import unittest
+from core.regional.culture import Culture, DisplayValues
+from core.lists.listutils import ListUtils
+
+ITEMS = [
+  { "name": "Madge Strong", "birthdate": "1988-01-12", "registered": "2014-03-18T02:55:21", "score": 1234.5 },
+  { "name": "Shelia Vaughn", "birthdate": "1990-05-03", "registered": "2014-03-13T03:07:30", "score": 20 }
+]
+
+
+class CultureTestCase(unittest.TestCase):
+    """
+      Tests for culture-dependent representations of values.
+    """
+    def test_normalize_lang(self):
+        self.assertEqual("it", Culture.normalize_lang("it"))
+        self.assertEqual("it", Culture.normalize_lang("it-IT"))
+        self.assertEqual("en-gb", Culture.normalize_lang("en_GB"))
+        self.assertEqual("en", Culture.normalize_lang("xx"))
+        self.assertEqual("en", Culture.normalize_lang(None))
+
+    def test_format_number(self):
+        self.assertEqual("1,234.5", Culture.format_number(1234.5))
+        self.assertEqual("0.333", Culture.format_number(1 / 3))
+        self.assertEqual("2", Culture.format_number(2.0))
+        self.assertEqual("1,234.5", Culture.format_number(1234.5, "en"))
+        self.assertEqual("1.234,5", Culture.format_number(1234.5, "it"))
+        self.assertEqual("1.000.000", Culture.format_number(1000000, "de"))
+
+    def test_display_values(self):
+        # default formats of the KingTable client are always included
+        values = Culture.get_display_values(ITEMS[0], "en")
+        self.assertIn("12.01.1988", values["birthdate"])
+        self.assertIn("18.03.2014 02:55:21", values["registered"])
+        self.assertIn("1,234.5", values["score"])
+        self.assertNotIn("name", values)
+
+        values = Culture.get_display_values(ITEMS[0], "it")
+        self.assertIn("12.01.1988", values["birthdate"])
+        self.assertIn("12/01/1988", values["birthdate"])
+        self.assertIn("18/03/2014 02:55:21", values["registered"])
+        self.assertIn("1.234,5", values["score"])
+
+        values = Culture.get_display_values(ITEMS[0], "en-US")
+        self.assertIn("01/12/1988", values["birthdate"])
+
+    def test_display_values_are_lazy(self):
+        class Unformattable(dict):
+            def items(self):
+                raise AssertionError("display values of this item should not be computed")
+
+        items = ITEMS + [Unformattable(name="Unformattable")]
+        display_values = DisplayValues(items, "it")
+        # the last item is never formatted, because the search stops before it
+        result = ListUtils.search(items, "12/01/1988", "*", 1, display_values)
+        self.assertEqual(["Madge Strong"], [x["name"] for x in result])
+        self.assertEqual(len(items), len(display_values))
+
+    def test_search_display_values(self):
+        display_values = [Culture.get_display_values(x, "it") for x in ITEMS]
+        result = ListUtils.search(ITEMS, "12/01/1988", "*", None, display_values)
+        self.assertEqual(["Madge Strong"], [x["name"] for x in result])
+
+        result = ListUtils.search(ITEMS, "1.234,5", "*", None, display_values)
+        self.assertEqual(["Madge Strong"], [x["name"] for x in result])
+
+        # only display values of the searched properties are matched
+        result = ListUtils.search(ITEMS, "12/01/1988", ["name"], None, display_values)
+        self.assertEqual([], result)
+
+        # non-string values are ignored when display values are not given
+        result = ListUtils.search(ITEMS, "1234", "*")
+        self.assertEqual([], result)
@@ -1,6 +1,9 @@
 import server
+import time
+import threading
 import unittest
 from flask import json
+from bll.collectionmanager import CollectionManager
 
 
 
@@ -28,3 +31,138 @@ class ServerTestCase(unittest.TestCase):
         rv = self.app.get('/api/colors?page=1&search=%&size=30&timestamp=2017-07-06T17%3A54%3A17.653Z')
         data = json.loads(rv.data)
         assert data["total"] == 1247
+
+    def test_batch_api(self):
+        queries = [
+            {"collection": "colors", "page": 1, "size": 10, "search": "green", "sortBy": [["name", -1]]},
+            {"collection": "colors", "page": 2, "size": 10, "search": "green", "sortBy": [["name", -1]]},
+            {"collection": "people", "page": 1, "size": 5}
+        ]
+        rv = self.app.post('/api/batch', data=json.dumps({"queries": queries}), content_type="application/json")
+        data = json.loads(rv.data)
+        results = data["results"]
+        assert len(results) == 3
+        assert results[0]["page"] == 1
+        assert results[1]["page"] == 2
+        assert results[0]["total"] == results[1]["total"]
+        # the first row of an optimized subset contains the property names
+        assert results[0]["subset"][1] != results[1]["subset"][1]
+        assert len(results[2]["subset"]) == 6
+
+    def test_batch_api_invalid_collection(self):
+        queries = [{"collection": "nope", "page": 1, "size": 10}]
+        rv = self.app.post('/api/batch', data=json.dumps({"queries": queries}), content_type="application/json")
+        assert rv.status_code == 400
+
+    def test_prefetch_adjacent_pages(self):
+        filters = {"page": 2, "size": 10, "prefetch": 1}
+        rv = self.app.post('/api/colors', data=json.dumps(filters), content_type="application/json")
+        data = json.loads(rv.data)
+        adjacent = data["adjacent"]
+        assert sorted(adjacent.keys()) == ["1", "3"]
+        assert len(adjacent["1"]) == 11
+        assert adjacent["1"][1] != data["subset"][1]
+
+    def test_lazy_total(self):
+        filters = {"page": 1, "size": 5, "search": "blue", "lazyTotal": True}
+        rv = self.app.post('/api/colors', data=json.dumps(filters), content_type="application/json")
+        data = json.loads(rv.data)
+        assert data["totalExact"] is False
+        assert data["total"] == 6
+        assert len(data["subset"]) == 6
+
+        count_filters = {"collection": "colors", "search": "blue"}
+        rv = self.app.post('/api/count', data=json.dumps(count_filters), content_type="application/json")
+        total = json.loads(rv.data)["total"]
+        assert total > 6
+
+        # once computed, the exact total is returned also for lazy requests
+        filters["page"] = 2
+        rv = self.app.post('/api/colors', data=json.dumps(filters), content_type="application/json")
+        data = json.loads(rv.data)
+        assert data["totalExact"] is True
+        assert data["total"] == total
+
+    def test_lazy_total_complete_search(self):
+        filters = {"page": 1, "size": 30, "search": "Absolute Zero", "lazyTotal": True}
+        rv = self.app.post('/api/colors', data=json.dumps(filters), content_type="application/json")
+        data = json.loads(rv.data)
+        assert data["totalExact"] is True
+        assert data["total"] == 1
+
+    def test_search_default_date_format(self):
+        # dates are displayed by default with DD.MM.YYYY format, whatever the table language
+        filters = {"page": 1, "size": 10, "search": "12.01.1988"}
+        rv = self.app.post('/api/people', data=json.dumps(filters), content_type="application/json")
+        data = json.loads(rv.data)
+        names = [x[0] for x in data["subset"][1:]]
+        assert "Madge Strong" in names
+
+    def test_search_culture_dependent_dates(self):
+        filters = {"page": 1, "size": 10, "search": "12/01/1988", "lang": "it"}
+        rv = self.app.post('/api/people', data=json.dumps(filters), content_type="application/json")
+        data = json.loads(rv.data)
+        assert data["total"] >= 1
+        names = [x[0] for x in data["subset"][1:]]
+        assert "Madge Strong" in names
+
+        filters["lang"] = "en"
+        rv = self.app.post('/api/people', data=json.dumps(filters), content_type="application/json")
+        data = json.loads(rv.data)
+        names = [x[0] for x in data["subset"][1:]]
+        assert "Madge Strong" not in names
+
+    def test_prefetch_first_page(self):
+        filters = {"page": 0, "size": 10, "prefetch": 2}
+        rv = self.app.post('/api/colors', data=json.dumps(filters), content_type="application/json")
+        data = json.loads(rv.data)
+        assert sorted(data["adjacent"].keys()) == ["2", "3"]
+
+    def test_prefetch_invalid(self):
+        filters = {"page": 1, "size": 10, "prefetch": "many"}
+        rv = self.app.post('/api/colors', data=json.dumps(filters), content_type="application/json")
+        assert rv.status_code == 200
+        data = json.loads(rv.data)
+        assert "adjacent" not in data
+
+    def test_lazy_total_drops_stale_selections(self):
+        class BlockingManager(CollectionManager):
+            """Collection manager whose first background search waits until the test releases it."""
+            def __init__(self, file_path):
+                super(BlockingManager, self).__init__(file_path)
+                self.event = threading.Event()
+
+            def get_selection(self, search, sort_by, lang=None):
+                if search == "b":
+                    self.event.wait(5)
+                return super(BlockingManager, self).get_selection(search, sort_by, lang)
+
+        def get_page(search):
+            return manager.get_catalog({"page": 1, "size": 5, "search": search, "lazyTotal": True})
+
+        manager = BlockingManager("colors.json")
+        # simulate a live search: the first selection occupies the background worker,
+        # the following ones wait and are replaced by newer ones
+        for search in ("b", "bl", "blu", "blue"):
+            self.assertFalse(get_page(search)["totalExact"])
+        manager.event.set()
+
+        for i in range(200):
+            if get_page("blue")["totalExact"]:
+                break
+            time.sleep(0.01)
+        self.assertTrue(get_page("blue")["totalExact"])
+        self.assertTrue(get_page("b")["totalExact"])
+        # stale selections were never computed
+        self.assertFalse(get_page("bl")["totalExact"])
+        self.assertFalse(get_page("blu")["totalExact"])
+
+    def test_batch_api_invalid_filters(self):
+        queries = [{"collection": "colors"}]
+        rv = self.app.post('/api/batch', data=json.dumps({"queries": queries}), content_type="application/json")
+        assert rv.status_code == 400
+
+    def test_count_api_invalid_filters(self):
+        filters = {"collection": "colors", "search": 10}
+        rv = self.app.post('/api/count', data=json.dumps(filters), content_type="application/json")
+        assert rv.status_code == 400